@@ -0,0 +1,335 @@
+"""Load-test and latency benchmark for the /diagnose scoring service.
+
+Starts src/api/app.py locally against a small synthetic model artifact,
+drives it with an open-loop load generator and writes throughput and
+latency percentiles to a JSON file that later runs can be compared against.
+
+    python benchmarks/load_test.py --rate 50 --duration 20
+    python benchmarks/load_test.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(PROJECT_ROOT, 'src', 'api', 'app.py')
+MODELS_DIR = os.path.join(PROJECT_ROOT, 'src', 'models')
+RESULTS_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'results')
+
+# Training column layout of the synthetic model; its request encoder is generated from this
+FEATURE_COLS = ['age', 'gender', 'lab_count', 'abnormal_count',
+                'type_ELECTIVE', 'type_EMERGENCY', 'type_URGENT']
+ADMISSION_TYPES = ['EMERGENCY', 'ELECTIVE', 'URGENT']
+ADMISSION_WEIGHTS = [0.78, 0.16, 0.06]
+
+PERCENTILES = [50, 90, 99, 99.9]
+# Metrics compared by --compare: (key, True if higher is better)
+COMPARED_METRICS = [('throughput_rps', True), ('p50_ms', False), ('p99_ms', False)]
+
+
+# --- Synthetic data ---
+
+def synthetic_record(rng):
+    """One /diagnose payload drawn from MIMIC-like marginal distributions."""
+    age = int(min(90, max(18, rng.gauss(63, 17))))
+    lab_count = int(rng.lognormvariate(5.0, 1.0))
+    abnormal_count = sum(1 for _ in range(min(lab_count, 400)) if rng.random() < 0.3)
+    return {
+        'age': age,
+        'gender': 'M' if rng.random() < 0.56 else 'F',
+        'lab_count': lab_count,
+        'abnormal_count': abnormal_count,
+        'admission_type': rng.choices(ADMISSION_TYPES, ADMISSION_WEIGHTS)[0]
+    }
+
+def build_synthetic_model(registry_dir, n_samples=2000, seed=42):
+    """Fit a small RandomForest + scaler on synthetic records and register it as champion."""
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    sys.path.append(MODELS_DIR)
+    from encoder import FeatureEncoder
+    from registry import ModelRegistry
+    from train import MODEL_NAME
+
+    rng = random.Random(seed)
+    records = [synthetic_record(rng) for _ in range(n_samples)]
+    labels = []
+    for r in records:
+        # Mortality rises with age and abnormal lab share
+        logit = -4.0 + 0.03 * r['age'] + 3.0 * r['abnormal_count'] / max(r['lab_count'], 1)
+        labels.append(int(rng.random() < 1 / (1 + np.exp(-logit))))
+
+    # Encode through the same encoder the service will use to score requests
+    X = FeatureEncoder(FEATURE_COLS).encode(records, scale=False)
+    scaler = StandardScaler()
+    model = RandomForestClassifier(n_estimators=100, random_state=seed)
+    model.fit(scaler.fit_transform(X), labels)
+
+    registry = ModelRegistry(registry_dir)
+    ref = registry.register(MODEL_NAME, model, scaler, FEATURE_COLS, extra={'synthetic': True})
+    registry.set_alias('champion', ref)
+    return ref
+
+
+# --- Service lifecycle ---
+
+def start_service(registry_dir, port, timeout=60):
+    # An empty SHADOW_MODEL alias keeps challenger scoring out of the measurements
+    env = dict(os.environ, MODEL_REGISTRY_DIR=registry_dir, SHADOW_MODEL='', PORT=str(port))
+    proc = subprocess.Popen([sys.executable, APP_PATH], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'Service exited early with code {proc.returncode}')
+        try:
+            urllib.request.urlopen(url + '/', timeout=1).close()
+            return proc, url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f'Service did not become ready within {timeout}s')
+
+
+# --- Load generation ---
+
+def post_json(url, payload):
+    body = json.dumps(payload).encode()
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        resp.read()
+        return resp.status == 200
+
+def make_payloads(batch_size, count, seed):
+    rng = random.Random(seed)
+    if batch_size == 1:
+        return [synthetic_record(rng) for _ in range(count)]
+    return [[synthetic_record(rng) for _ in range(batch_size)] for _ in range(count)]
+
+def run_open_loop(url, rate, duration, batch_size, seed, max_workers=256):
+    """Send requests on a fixed Poisson schedule regardless of how fast responses come back.
+
+    Latency is measured from each request's *scheduled* start, so queueing
+    inside a saturated server shows up in the percentiles instead of
+    silently lowering the send rate (coordinated omission).
+    """
+    rng = random.Random(seed)
+    n_requests = max(1, int(rate * duration))
+    payloads = make_payloads(batch_size, n_requests, seed)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+
+    def fire(payload, scheduled):
+        try:
+            ok = post_json(url, payload)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    scheduled = start
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for payload in payloads:
+            scheduled += rng.expovariate(rate)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, payload, scheduled)
+    wall = time.perf_counter() - start
+    return summarize(latencies, errors[0], wall, batch_size, offered_rps=rate)
+
+def run_closed_loop(url, concurrency, duration, batch_size, seed):
+    """Saturate the service with `concurrency` clients, each sending back-to-back."""
+    payloads = make_payloads(batch_size, 512, seed)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(worker):
+        i = worker
+        while time.perf_counter() < stop_at:
+            sent = time.perf_counter()
+            try:
+                ok = post_json(url, payloads[i % len(payloads)])
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - sent
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+            i += concurrency
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return summarize(latencies, errors[0], wall, batch_size, concurrency=concurrency)
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies, errors, wall, batch_size, **extra):
+    latencies = sorted(latencies)
+    ms = [v * 1000 for v in latencies]
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'batch_size': batch_size,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'records_per_second': round(len(latencies) * batch_size / wall, 2) if wall else 0.0,
+        'mean_ms': round(sum(ms) / len(ms), 3) if ms else None,
+        'max_ms': round(ms[-1], 3) if ms else None,
+    }
+    for pct in PERCENTILES:
+        value = percentile(ms, pct)
+        summary[f'p{pct:g}_ms'.replace('.', '_')] = round(value, 3) if value is not None else None
+    summary.update(extra)
+    return summary
+
+
+# --- Reporting ---
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=PROJECT_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline, tolerance):
+    """Return a list of human-readable regressions beyond `tolerance` (fractional)."""
+    regressions = []
+    for name, result in current['workloads'].items():
+        base = baseline.get('workloads', {}).get(name)
+        if not base:
+            continue
+        # Any failed request beyond the baseline's count is a regression, whatever the tolerance
+        new_errors, old_errors = result.get('errors', 0), base.get('errors', 0)
+        if new_errors > old_errors:
+            regressions.append(f'{name}.errors: {old_errors} -> {new_errors}')
+        for key, higher_is_better in COMPARED_METRICS:
+            new, old = result.get(key), base.get(key)
+            if not old:
+                continue
+            if not new:
+                # Zero throughput or no latencies at all (every request failed)
+                regressions.append(f'{name}.{key}: {old} -> {new}')
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f'{name}.{key}: {old} -> {new} ({change:+.1%})')
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='Benchmark an already-running service instead of starting one')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--rate', type=float, default=50.0, help='Open-loop arrival rate (requests/s)')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per workload')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workloads', default='single,batch,concurrent')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Seconds of unrecorded load first')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Result JSON path (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='Baseline result JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed fractional regression')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workloads = [w.strip() for w in args.workloads.split(',') if w.strip()]
+
+    proc = None
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            print('Building synthetic model artifact...')
+            build_synthetic_model(artifact_dir)
+            print(f'Starting service on port {args.port}...')
+            proc, url = start_service(artifact_dir, args.port)
+        endpoint = url + '/diagnose'
+
+        try:
+            if args.warmup > 0:
+                run_closed_loop(endpoint, 2, args.warmup, 1, args.seed)
+
+            results = {}
+            for name in workloads:
+                print(f'Running {name} workload...')
+                if name == 'single':
+                    results[name] = run_open_loop(endpoint, args.rate, args.duration, 1, args.seed)
+                elif name == 'batch':
+                    results[name] = run_open_loop(endpoint, args.rate, args.duration, args.batch_size, args.seed)
+                elif name == 'concurrent':
+                    results[name] = run_closed_loop(endpoint, args.concurrency, args.duration, 1, args.seed)
+                else:
+                    raise SystemExit(f'Unknown workload: {name}')
+                r = results[name]
+                print(f"  {r['throughput_rps']} req/s, p50 {r['p50_ms']} ms, p99 {r['p99_ms']} ms, errors {r['errors']}")
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': vars(args),
+        'workloads': results
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results saved to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print('Regressions detected:')
+            for line in regressions:
+                print(f'  {line}')
+            sys.exit(1)
+        print('No regressions beyond tolerance.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+# How long a cached payload is trusted before the aggregates file is re-checked
+DEFAULT_TTL_SECONDS = 30
+
+
+class AnalyticsCache:
+    """Serves the precomputed cohort aggregates written by etl.py.
+
+    The parsed payload is kept in memory and re-validated at most once per
+    TTL window by comparing the aggregates file's (and charts folder's)
+    mtime, so repeated dashboard refreshes never touch the processed
+    dataset. Re-running the ETL or visualization scripts changes the mtime
+    and the next check picks up the new numbers.
+    """
+
+    def __init__(self, aggregates_path, charts_dir, ttl=DEFAULT_TTL_SECONDS):
+        self.aggregates_path = aggregates_path
+        self.charts_dir = charts_dir
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (payload, serialized bodies keyed by breakdown) swapped atomically on reload
+        self._entry = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def get_json(self, breakdown=None):
+        """Return the serialized payload (or one breakdown of it), memoized per reload.
+
+        `breakdown` may be any key of the payload's breakdowns, or 'charts'.
+        Returns None if no aggregates exist yet; raises KeyError for an unknown breakdown.
+        """
+        entry = self._current()
+        if entry is None:
+            return None
+        payload, bodies = entry
+        body = bodies.get(breakdown)
+        if body is None:
+            if breakdown is None:
+                section = {'status': 'success', **payload}
+            elif breakdown == 'charts':
+                section = {'status': 'success', 'charts': payload['charts']}
+            else:
+                section = {'status': 'success', 'breakdown': breakdown,
+                           'rows': payload['breakdowns'][breakdown]}
+            body = json.dumps(section)
+            bodies[breakdown] = body
+        return body
+
+    def _current(self):
+        now = time.monotonic()
+        entry = self._entry
+        if entry is not None and now - self._checked_at < self.ttl:
+            return entry
+
+        with self._lock:
+            if self._entry is not None and now - self._checked_at < self.ttl:
+                return self._entry
+            try:
+                mtime = (os.path.getmtime(self.aggregates_path), self._charts_mtime())
+            except OSError:
+                self._entry, self._mtime = None, None
+                return None
+            if mtime != self._mtime:
+                self._entry = (self._load(), {})
+                self._mtime = mtime
+            self._checked_at = now
+            return self._entry
+
+    def _load(self):
+        with open(self.aggregates_path) as f:
+            aggregates = json.load(f)
+        aggregates['charts'] = self._list_charts()
+        return aggregates
+
+    def _charts_mtime(self):
+        return os.path.getmtime(self.charts_dir) if os.path.isdir(self.charts_dir) else None
+
+    def _list_charts(self):
+        if not os.path.isdir(self.charts_dir):
+            return []
+        return [
+            {'name': name, 'url': f'/analytics/charts/{name}'}
+            for name in sorted(os.listdir(self.charts_dir))
+            if name.endswith('.png')
+        ]
@@ -1,37 +1,79 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string, send_from_directory
 import joblib
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 
+from analytics import DEFAULT_TTL_SECONDS, AnalyticsCache
+
 app = Flask(__name__)
 
 # Load Model and Scaler
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # src/api -> src/models (up one level to src, then models)
 models_dir = os.path.join(os.path.dirname(BASE_DIR), 'models')
-MODEL_PATH = os.path.join(models_dir, 'model.joblib')
-SCALER_PATH = os.path.join(models_dir, 'scaler.pkl')
-
-print(f"Loading model from {MODEL_PATH}...")
-try:
-    if os.path.exists(MODEL_PATH):
-        model = joblib.load(MODEL_PATH)
-        scaler = joblib.load(SCALER_PATH)
-        print("Scikit-Learn Model loaded successfully.")
-    else:
-        print(f"CRITICAL ERROR: Model file not found at {MODEL_PATH}")
-        model = None
-        scaler = None
-except Exception as e:
-    print(f"CRITICAL ERROR: Failed to load model/scaler. {e}")
-    model = None
-    scaler = None
-
-# Feature columns verification (must match training)
+sys.path.append(models_dir)
+from encoder import PASSTHROUGH_FIELDS, FeatureEncoder, SchemaError
+from registry import REGISTRY_DIR, ModelNotFoundError, ModelRegistry
+
+# Model registry: requests pick a model via the 'model' field (or ?model= for batches).
+# Requests on the default model are also scored by SHADOW_MODEL (empty to disable) in the background.
+DEFAULT_MODEL = os.environ.get('DEFAULT_MODEL', 'champion')
+SHADOW_MODEL = os.environ.get('SHADOW_MODEL', 'challenger')
+SHADOW_MAX_PENDING = int(os.environ.get('SHADOW_MAX_PENDING', 100))
+registry = ModelRegistry(os.environ.get('MODEL_REGISTRY_DIR', REGISTRY_DIR),
+                         max_resident=int(os.environ.get('MAX_RESIDENT_MODELS', 4)))
+shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+shadow_lock = threading.Lock()
+shadow_stats = {'pending': 0, 'scored': 0, 'dropped': 0, 'errors': 0,
+                'level_agreements': 0, 'abs_diff_sum': 0.0}
+
+# Legacy single-model artifacts, used when the registry has no DEFAULT_MODEL
+MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(models_dir, 'model.joblib'))
+SCALER_PATH = os.environ.get('SCALER_PATH', os.path.join(models_dir, 'scaler.pkl'))
+
+# Analytics: aggregates precomputed by etl.py, charts generated by visualization.py
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BASE_DIR))
+AGGREGATES_PATH = os.path.join(PROJECT_ROOT, 'data', 'processed', 'aggregates.json')
+CHARTS_DIR = os.path.join(PROJECT_ROOT, 'output')
+analytics_cache = AnalyticsCache(AGGREGATES_PATH, CHARTS_DIR,
+                                 ttl=float(os.environ.get('ANALYTICS_CACHE_TTL', DEFAULT_TTL_SECONDS)))
+
+# Fallback column order for legacy scalers saved without feature names
 FEATURE_COLS = ['age', 'gender', 'lab_count', 'abnormal_count', 
                 'type_ELECTIVE', 'type_EMERGENCY', 'type_URGENT']
 
+# Loaded on first use, and only if the registry cannot serve DEFAULT_MODEL,
+# so a registry deployment never holds a second copy outside the LRU bound
+legacy_lock = threading.Lock()
+legacy_model = None  # (model, encoder) once loaded, False if loading failed
+
+def load_legacy_model():
+    global legacy_model
+    with legacy_lock:
+        if legacy_model is not None:
+            return legacy_model or None
+        print(f"Loading model from {MODEL_PATH}...")
+        try:
+            if os.path.exists(MODEL_PATH):
+                model = joblib.load(MODEL_PATH)
+                scaler = joblib.load(SCALER_PATH)
+                # Encode in the column order the scaler was fitted on (train.py fits it on a DataFrame)
+                trained_cols = getattr(scaler, 'feature_names_in_', None)
+                encoder = FeatureEncoder(FEATURE_COLS if trained_cols is None else list(trained_cols)).bind(scaler, model)
+                legacy_model = (model, encoder)
+                print("Scikit-Learn Model loaded successfully.")
+            else:
+                print(f"CRITICAL ERROR: Model file not found at {MODEL_PATH}")
+                legacy_model = False
+        except Exception as e:
+            print(f"CRITICAL ERROR: Failed to load model/scaler. {e}")
+            legacy_model = False
+        return legacy_model or None
+
 INDEX_HTML = """
 <!DOCTYPE html>
 <html lang="en">
@@ -292,7 +334,15 @@ INDEX_HTML = """
             const restrictedMsg = "Access Restricted: This feature is currently under development for the MIMIC-III Clinical Suite.";
             const settingsMsg = "System Configuration Locked: Administrative privileges required to modify risk thresholds.";
 
-            ['btn-analytics', 'btn-logs'].forEach(id => {
+            const analyticsBtn = document.getElementById('btn-analytics');
+            if (analyticsBtn) {
+                analyticsBtn.addEventListener('click', (e) => {
+                    e.preventDefault();
+                    window.open('/analytics', '_blank');
+                });
+            }
+
+            ['btn-logs'].forEach(id => {
                 const btn = document.getElementById(id);
                 if (btn) {
                     btn.addEventListener('click', (e) => {
@@ -337,7 +387,11 @@ INDEX_HTML = """
                         body: JSON.stringify(formData)
                     });
 
-                    if (!response.ok) throw new Error('Network response was not ok');
+                    if (!response.ok) {
+                        const err = await response.json().catch(() => ({}));
+                        const details = (err.errors || []).map(e => `${e.field}: ${e.message}`).join('\n');
+                        throw new Error(details || err.message || 'Network response was not ok');
+                    }
 
                     const result = await response.json();
                     updateDashboard(result);
@@ -449,58 +503,140 @@ INDEX_HTML = """
 def index():
     return render_template_string(INDEX_HTML)
 
+def risk_level(mortality_risk):
+    return 'High' if mortality_risk > 0.55 else ('Moderate' if mortality_risk >= 0.35 else 'Low')
+
+def select_model(ref):
+    """Return (ref, model, encoder) for an explicit ref, or the default model when ref is None."""
+    try:
+        loaded = registry.get(ref or DEFAULT_MODEL)
+        return loaded.ref, loaded.model, loaded.encoder
+    except ModelNotFoundError:
+        legacy = load_legacy_model() if ref is None else None
+        if legacy is None:
+            raise
+        return ('legacy',) + legacy
+
+def score_shadow(served_ref, records, served_risks):
+    # Runs on shadow_executor: score the challenger and record how it compares to what was served.
+    # Records are re-encoded because the challenger may have been trained on different columns.
+    try:
+        shadow = registry.get(SHADOW_MODEL)
+        if shadow.ref != served_ref:
+            risks = shadow.model.predict_proba(shadow.encoder.encode(records))[:, 1]
+            with shadow_lock:
+                shadow_stats['scored'] += len(risks)
+                shadow_stats['abs_diff_sum'] += float(np.abs(risks - served_risks).sum())
+                shadow_stats['level_agreements'] += sum(
+                    risk_level(a) == risk_level(b) for a, b in zip(risks.tolist(), served_risks.tolist()))
+    except ModelNotFoundError:
+        pass
+    except Exception as e:
+        # Includes SchemaError when the challenger's schema rejects what the champion accepted
+        print(f"Error in shadow scoring: {e}")
+        with shadow_lock:
+            shadow_stats['errors'] += 1
+    finally:
+        with shadow_lock:
+            shadow_stats['pending'] -= 1
+
+def submit_shadow(served_ref, records, served_risks):
+    with shadow_lock:
+        if shadow_stats['pending'] >= SHADOW_MAX_PENDING:
+            shadow_stats['dropped'] += 1
+            return
+        shadow_stats['pending'] += 1
+    shadow_executor.submit(score_shadow, served_ref, records, served_risks)
+
 @app.route('/diagnose', methods=['POST'])
 def diagnose():
     try:
         data = request.json
         print(f"Received data: {data}")
         
-        if model is None or scaler is None:
-            return jsonify({'status': 'error', 'message': 'Model or Scaler not loaded on server.'}), 500
-        
-        # Preprocessing
-        # 1. Gender mapping
-        gender_val = 0 if data.get('gender') == 'M' else 1
+        # A JSON list is scored as one batch
+        if not isinstance(data, (list, dict)):
+            return jsonify({'status': 'error', 'message': 'Request body must be a JSON object or list.'}), 400
+        records = data if isinstance(data, list) else [data]
+        if not records:
+            return jsonify({'status': 'error', 'message': 'Empty batch.'}), 400
         
-        # 2. Admission Type One-Hot
-        adm_type = data.get('admission_type', 'EMERGENCY')
-        type_elective = 1 if adm_type == 'ELECTIVE' else 0
-        type_emergency = 1 if adm_type == 'EMERGENCY' else 0
-        type_urgent = 1 if adm_type == 'URGENT' else 0
+        requested_ref = request.args.get('model') if isinstance(data, list) else data.get('model')
+        if requested_ref is not None and not isinstance(requested_ref, str):
+            return jsonify({'status': 'error', 'message': 'Field model must be a string.'}), 400
+        try:
+            model_ref, active_model, active_encoder = select_model(requested_ref)
+        except ModelNotFoundError:
+            if requested_ref is None:
+                return jsonify({'status': 'error', 'message': 'Model or Scaler not loaded on server.'}), 500
+            return jsonify({'status': 'error', 'message': f'Unknown model: {requested_ref}'}), 404
         
-        # 3. Create Feature Vector
-        features = [
-            data.get('age', 60),
-            gender_val,
-            data.get('lab_count', 0),
-            data.get('abnormal_count', 0),
-            type_elective,
-            type_emergency,
-            type_urgent
-        ]
+        # Validate, encode and scale in training column order
+        try:
+            # Batches choose their model with ?model=, so a per-record 'model' would be silently ignored
+            extra_fields = frozenset() if isinstance(data, list) else PASSTHROUGH_FIELDS
+            features_scaled = active_encoder.encode(records, extra_fields=extra_fields)
+        except SchemaError as e:
+            return jsonify({'status': 'error', 'message': 'Invalid request.', 'errors': e.errors}), 400
         
-        # 4. Scale
-        features_array = np.array([features])
-        features_scaled = scaler.transform(features_array)
-        
-        # 5. Predict Probabilities using Scikit-Learn
-        prediction_probs = model.predict_proba(features_scaled)
+        # Predict Probabilities using Scikit-Learn
         # Class 1 is mortality risk
-        mortality_risk = float(prediction_probs[0][1])
+        mortality_risks = active_model.predict_proba(features_scaled)[:, 1]
+        results = [{
+            'mortality_risk': risk,
+            'risk_level': risk_level(risk)
+        } for risk in mortality_risks.tolist()]
         
-        return jsonify({
-            'status': 'success',
-            'mortality_risk': mortality_risk,
-            'risk_level': 'High' if mortality_risk > 0.55 else ('Moderate' if mortality_risk >= 0.35 else 'Low')
-        })
+        # Challenger scoring happens after the response is built, off the request thread
+        if SHADOW_MODEL and requested_ref is None and model_ref != 'legacy':
+            submit_shadow(model_ref, records, mortality_risks)
         
-    except Exception as e:
-        print(f"Error in diagnose: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        if isinstance(data, list):
+            return jsonify({'status': 'success', 'model': model_ref, 'results': results})
+        return jsonify({'status': 'success', 'model': model_ref, **results[0]})
         
     except Exception as e:
         print(f"Error in diagnose: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/models', methods=['GET'])
+def models():
+    with shadow_lock:
+        stats = dict(shadow_stats)
+    scored = stats.pop('scored')
+    shadow = {
+        'model': SHADOW_MODEL,
+        'scored': scored,
+        'pending': stats['pending'],
+        'dropped': stats['dropped'],
+        'errors': stats['errors'],
+        'mean_abs_diff': stats['abs_diff_sum'] / scored if scored else None,
+        'risk_level_agreement': stats['level_agreements'] / scored if scored else None
+    }
+    return jsonify({
+        'status': 'success',
+        'default': DEFAULT_MODEL,
+        'aliases': registry.aliases(),
+        'resident': registry.resident(),
+        'max_resident': registry.max_resident,
+        'models': registry.list_models(),
+        'shadow': shadow
+    })
+
+@app.route('/analytics', methods=['GET'])
+@app.route('/analytics/<breakdown>', methods=['GET'])
+def analytics(breakdown=None):
+    try:
+        body = analytics_cache.get_json(breakdown)
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f'Unknown breakdown: {breakdown}'}), 404
+    if body is None:
+        return jsonify({'status': 'error', 'message': 'Cohort aggregates not found. Run etl.py first.'}), 503
+    return Response(body, mimetype='application/json')
+
+@app.route('/analytics/charts/<path:name>', methods=['GET'])
+def analytics_chart(name):
+    return send_from_directory(CHARTS_DIR, name)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
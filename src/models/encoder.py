@@ -0,0 +1,227 @@
+import json
+import math
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+# Request schema for every column etl.py can emit. A new model's encoder is
+# generated from the column list it was trained on and saved with it, so the API
+# encodes exactly the layout the scaler and model saw. Saved encoders keep their
+# own copy of these rules; editing them here only affects newly trained models.
+GENDER_CODES = {'M': 0, 'F': 1}  # Same mapping as etl.py
+ONE_HOT_FIELDS = {'type_': 'admission_type'}  # Column prefix -> request field (pd.get_dummies in etl.py)
+NUMERIC_FIELDS = {
+    # field: (min, max, clip_to, integer) -- clip_to mirrors etl.py capping ages above 90
+    'age': (0, 150, 90, False),
+    'lab_count': (0, None, None, True),
+    'abnormal_count': (0, None, None, True),
+}
+# Fields that are allowed in a request but are not model inputs
+PASSTHROUGH_FIELDS = frozenset({'model'})
+
+
+class SchemaError(ValueError):
+    """Raised when request records don't match the encoder's schema.
+
+    `errors` is a list of {'index', 'field', 'message'} dicts, one per problem.
+    """
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f"[{e['index']}] {e['field']}: {e['message']}" for e in errors))
+        self.errors = errors
+
+
+class FeatureEncoder:
+    """Validates request records and encodes them into a float matrix in training column order."""
+
+    def __init__(self, feature_cols, schema=None):
+        self.feature_cols = list(feature_cols)
+        self.schema = build_schema(self.feature_cols) if schema is None else schema
+        self._compile()
+
+    @classmethod
+    def from_dict(cls, spec):
+        schema = {key: spec[key] for key in ('numeric', 'categorical', 'one_hot')}
+        return cls(spec['feature_cols'], schema)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {'feature_cols': self.feature_cols, **self.schema}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def bind(self, scaler=None, model=None):
+        """Check the encoder against fitted artifacts and fold the scaler into encode().
+
+        Raises ValueError if the column list disagrees with what the scaler or
+        model were fitted on, so train/serve skew fails at load time instead
+        of producing silently wrong scores.
+        """
+        n_features = len(self.feature_cols)
+        for name, fitted in (('scaler', scaler), ('model', model)):
+            if fitted is None:
+                continue
+            trained_cols = getattr(fitted, 'feature_names_in_', None)
+            if trained_cols is not None and list(trained_cols) != self.feature_cols:
+                raise ValueError(f'Encoder columns {self.feature_cols} do not match {name} columns {list(trained_cols)}')
+            trained_n = getattr(fitted, 'n_features_in_', n_features)
+            if trained_n != n_features:
+                raise ValueError(f'Encoder has {n_features} columns but {name} was fitted on {trained_n}')
+
+        # StandardScaler.transform re-validates its input on every call; applying
+        # the fitted statistics in place is equivalent and much cheaper per request
+        self._mean = self._scale = self._scaler = None
+        if isinstance(scaler, StandardScaler):
+            self._mean = scaler.mean_ if scaler.with_mean else None
+            self._scale = scaler.scale_ if scaler.with_std else None
+        elif scaler is not None:
+            self._scaler = scaler
+        return self
+
+    def encode(self, records, scale=True, extra_fields=PASSTHROUGH_FIELDS):
+        """Validate `records` (a dict or list of dicts) and return an (n, n_features) float array.
+
+        `extra_fields` are non-feature fields the caller handles itself and
+        which are therefore accepted; any other field is reported as an error.
+        Raises SchemaError listing every invalid field across the batch.
+        """
+        if isinstance(records, dict):
+            records = [records]
+        out = np.empty((len(records), len(self.feature_cols)), dtype=np.float64)
+        errors = []
+        template = self._template
+        known = self._known_fields | extra_fields
+
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors.append({'index': i, 'field': None, 'message': 'record must be a JSON object'})
+                continue
+            row = template[:]
+            n_errors = len(errors)
+
+            for field, col, low, high, clip_to, integer in self._numeric:
+                value = record.get(field)
+                if value is None:
+                    errors.append({'index': i, 'field': field, 'message': 'is required'})
+                    continue
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    errors.append({'index': i, 'field': field, 'message': f'must be a number, got {value!r}'})
+                    continue
+                try:
+                    number = float(value)
+                except OverflowError:
+                    # JSON integers are unbounded; anything past float range can't be encoded
+                    errors.append({'index': i, 'field': field, 'message': 'is too large'})
+                    continue
+                if not math.isfinite(number):
+                    errors.append({'index': i, 'field': field, 'message': f'must be a number, got {value!r}'})
+                    continue
+                if integer and not number.is_integer():
+                    errors.append({'index': i, 'field': field, 'message': f'must be a whole number, got {value!r}'})
+                    continue
+                if (low is not None and number < low) or (high is not None and number > high):
+                    bounds = f'between {low} and {high}' if high is not None else f'at least {low}'
+                    errors.append({'index': i, 'field': field, 'message': f'must be {bounds}, got {value!r}'})
+                    continue
+                row[col] = clip_to if clip_to is not None and number > clip_to else number
+
+            numeric_ok = len(errors) == n_errors
+
+            for field, col, mapping in self._categorical:
+                value = record.get(field)
+                code = mapping.get(value) if isinstance(value, str) else None
+                if code is None:
+                    message = 'is required' if value is None else f'must be one of {sorted(mapping)}, got {value!r}'
+                    errors.append({'index': i, 'field': field, 'message': message})
+                    continue
+                row[col] = code
+
+            for field, cols in self._one_hot:
+                value = record.get(field)
+                col = cols.get(value) if isinstance(value, str) else None
+                if col is None:
+                    message = 'is required' if value is None else f'must be one of {sorted(cols)}, got {value!r}'
+                    errors.append({'index': i, 'field': field, 'message': message})
+                    continue
+                row[col] = 1.0
+
+            if self._check_abnormal and numeric_ok:
+                labs, abnormal = record['lab_count'], record['abnormal_count']
+                if abnormal > labs:
+                    errors.append({'index': i, 'field': 'abnormal_count',
+                                   'message': f'cannot exceed lab_count ({labs}), got {abnormal!r}'})
+
+            unknown = record.keys() - known
+            if unknown:
+                errors.extend({'index': i, 'field': f,
+                               'message': 'is not accepted in this request' if f in PASSTHROUGH_FIELDS
+                               else 'is not a recognised field'} for f in sorted(unknown))
+
+            out[i] = row
+
+        if errors:
+            raise SchemaError(errors)
+
+        if scale:
+            if self._mean is not None:
+                out -= self._mean
+            if self._scale is not None:
+                out /= self._scale
+            if self._scaler is not None:
+                out = self._scaler.transform(out)
+        return out
+
+    def _compile(self):
+        # Turn the column list and schema into flat per-field instructions for encode()
+        if len(set(self.feature_cols)) != len(self.feature_cols):
+            raise ValueError(f'Duplicate training columns in {self.feature_cols}')
+        col_index = {name: col for col, name in enumerate(self.feature_cols)}
+        covered = set()
+
+        def column(name):
+            if name not in col_index:
+                raise ValueError(f'Encoder schema refers to unknown training column {name!r}')
+            if name in covered:
+                raise ValueError(f'Training column {name!r} is encoded twice')
+            covered.add(name)
+            return col_index[name]
+
+        self._numeric = [(field, column(field)) + tuple(rule)
+                         for field, rule in self.schema['numeric'].items()]
+        self._categorical = [(field, column(field), dict(mapping))
+                             for field, mapping in self.schema['categorical'].items()]
+        self._one_hot = [(field, {value: column(name) for value, name in columns.items()})
+                         for field, columns in self.schema['one_hot'].items()]
+
+        missing = [name for name in self.feature_cols if name not in covered]
+        if missing:
+            raise ValueError(f'No request schema for training columns {missing}')
+
+        self._template = [0.0] * len(self.feature_cols)
+        self._known_fields = (frozenset(self.schema['numeric']) | set(self.schema['categorical'])
+                              | set(self.schema['one_hot']))
+        self._check_abnormal = {'lab_count', 'abnormal_count'} <= set(self.schema['numeric'])
+        self._mean = self._scale = self._scaler = None
+
+
+def build_schema(feature_cols):
+    """Generate the request schema for a training column list from the rules above."""
+    schema = {'numeric': {}, 'categorical': {}, 'one_hot': {}}
+    for name in feature_cols:
+        if name in NUMERIC_FIELDS:
+            schema['numeric'][name] = list(NUMERIC_FIELDS[name])
+        elif name == 'gender':
+            schema['categorical'][name] = dict(GENDER_CODES)
+        else:
+            prefix = next((p for p in ONE_HOT_FIELDS if name.startswith(p)), None)
+            if prefix is None:
+                raise ValueError(f'No request schema for training column {name!r}')
+            # One-hot columns are stored as {category: column name}
+            schema['one_hot'].setdefault(ONE_HOT_FIELDS[prefix], {})[name[len(prefix):]] = name
+    return schema
@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+import joblib
+
+from encoder import FeatureEncoder
+
+# Layout: <registry>/<name>/<version>/{model.joblib, scaler.pkl, encoder.json, metadata.json}
+#         <registry>/aliases.json  -> {"champion": "mortality:3", "hospital-a": "mortality:2", ...}
+REGISTRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'registry')
+MODEL_FILE = 'model.joblib'
+SCALER_FILE = 'scaler.pkl'
+ENCODER_FILE = 'encoder.json'
+METADATA_FILE = 'metadata.json'
+ALIASES_FILE = 'aliases.json'
+# Model names come from request fields, so keep them to plain directory names
+VALID_NAME = re.compile(r'^[A-Za-z0-9_-][A-Za-z0-9_.-]*$')
+
+LoadedModel = namedtuple('LoadedModel', ['ref', 'model', 'scaler', 'encoder', 'metadata'])
+
+
+class ModelNotFoundError(KeyError):
+    pass
+
+
+class ModelRegistry:
+    """Versioned model artifacts on disk with lazily loaded, LRU-bounded residency.
+
+    Models are addressed either as "name:version" or by an alias such as
+    "champion", "challenger" or a hospital id. At most `max_resident`
+    models are kept in memory; the least recently used one is evicted
+    when another has to be loaded.
+    """
+
+    def __init__(self, root=REGISTRY_DIR, max_resident=4):
+        self.root = root
+        self.max_resident = max(1, max_resident)
+        self._lock = threading.Lock()
+        self._resident = OrderedDict()
+        self._loading = {}  # Per-key locks so concurrent cold requests load a model only once
+        self._aliases = ({}, None)  # (aliases, mtime of aliases.json)
+
+    # --- Writing (used by train.py) ---
+
+    def register(self, name, model, scaler, feature_cols, test_auc=None, extra=None):
+        """Save a new version of `name` and return its "name:version" ref.
+
+        The request encoder is generated from `feature_cols` and checked
+        against the fitted scaler/model before anything is written.
+        """
+        encoder = FeatureEncoder(feature_cols).bind(scaler, model)
+        # Number past every existing directory, including incomplete ones, so the final rename can't collide
+        version = max(self._version_dirs(name, complete=False), default=0) + 1
+        version_dir = os.path.join(self.root, name, str(version))
+        # Write into a hidden sibling and rename at the end, so an interrupted run never leaves a half-written version
+        tmp_dir = os.path.join(self.root, name, f'.tmp-{version}-{os.getpid()}')
+        os.makedirs(tmp_dir)
+
+        encoder.save(os.path.join(tmp_dir, ENCODER_FILE))
+        joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+        joblib.dump(scaler, os.path.join(tmp_dir, SCALER_FILE))
+        size_bytes = sum(os.path.getsize(os.path.join(tmp_dir, f)) for f in (MODEL_FILE, SCALER_FILE))
+
+        metadata = {
+            'name': name,
+            'version': version,
+            'feature_cols': list(feature_cols),
+            'test_auc': test_auc,
+            'size_bytes': size_bytes,
+            'created_at': datetime.now(timezone.utc).isoformat()
+        }
+        metadata.update(extra or {})
+        with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.rename(tmp_dir, version_dir)
+        return f'{name}:{version}'
+
+    def set_alias(self, alias, ref):
+        self.metadata(ref)  # Fail early on unknown refs
+        aliases = self.aliases()
+        aliases[alias] = self._canonical(ref)
+        tmp_path = os.path.join(self.root, ALIASES_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(aliases, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.root, ALIASES_FILE))
+
+    # --- Lookup ---
+
+    def names(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def versions(self, name):
+        return self._version_dirs(name)
+
+    def aliases(self):
+        # Re-read only when aliases.json changes; a stat is cheap enough for the request path
+        path = os.path.join(self.root, ALIASES_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        aliases, cached_mtime = self._aliases
+        if mtime != cached_mtime:
+            with open(path) as f:
+                aliases = json.load(f)
+            self._aliases = (aliases, mtime)
+        return dict(aliases)
+
+    def resolve(self, ref):
+        """Turn an alias, "name" (latest version) or "name:version" into "name:version"."""
+        ref = self.aliases().get(ref, ref)
+        return self._canonical(ref)
+
+    def metadata(self, ref):
+        name, version = self.resolve(ref).split(':')
+        path = os.path.join(self.root, name, version, METADATA_FILE)
+        if not os.path.exists(path):
+            raise ModelNotFoundError(ref)
+        with open(path) as f:
+            return json.load(f)
+
+    def list_models(self):
+        return [self.metadata(f'{name}:{version}') for name in self.names() for version in self.versions(name)]
+
+    # --- Serving ---
+
+    def get(self, ref):
+        """Return the LoadedModel for `ref`, loading it on first use."""
+        key = self._canonical(self.aliases().get(ref, ref))
+        with self._lock:
+            loaded = self._resident.get(key)
+            if loaded is not None:
+                self._resident.move_to_end(key)
+                return loaded
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so one slow load doesn't stall requests for resident models
+        with load_lock:
+            with self._lock:
+                loaded = self._resident.get(key)
+                if loaded is not None:
+                    self._resident.move_to_end(key)
+                    return loaded
+
+            name, version = key.split(':')
+            version_dir = os.path.join(self.root, name, version)
+            metadata = self.metadata(key)
+            model = joblib.load(os.path.join(version_dir, MODEL_FILE))
+            scaler = joblib.load(os.path.join(version_dir, SCALER_FILE))
+            encoder_path = os.path.join(version_dir, ENCODER_FILE)
+            if os.path.exists(encoder_path):
+                encoder = FeatureEncoder.load(encoder_path)
+            else:
+                encoder = FeatureEncoder(metadata['feature_cols'])
+            loaded = LoadedModel(
+                ref=key,
+                model=model,
+                scaler=scaler,
+                encoder=encoder.bind(scaler, model),
+                metadata=metadata
+            )
+
+            with self._lock:
+                self._resident[key] = loaded
+                self._resident.move_to_end(key)
+                self._loading.pop(key, None)
+                while len(self._resident) > self.max_resident:
+                    evicted, _ = self._resident.popitem(last=False)
+                    print(f"Evicted model {evicted} from memory.")
+        return loaded
+
+    def resident(self):
+        with self._lock:
+            return list(self._resident)
+
+    def _version_dirs(self, name, complete=True):
+        # complete=True skips version directories without metadata (e.g. left by older, interrupted runs)
+        name_dir = os.path.join(self.root, name)
+        if not os.path.isdir(name_dir):
+            return []
+        return sorted(
+            int(d) for d in os.listdir(name_dir)
+            if d.isdigit() and (not complete or os.path.exists(os.path.join(name_dir, d, METADATA_FILE)))
+        )
+
+    def _canonical(self, ref):
+        name, _, version = ref.partition(':')
+        if not VALID_NAME.match(name):
+            raise ModelNotFoundError(ref)
+        versions = self.versions(name)
+        if not version:
+            if not versions:
+                raise ModelNotFoundError(ref)
+            return f'{name}:{versions[-1]}'
+        if not version.isdigit() or int(version) not in versions:
+            raise ModelNotFoundError(ref)
+        return f'{name}:{int(version)}'
@@ -6,9 +6,12 @@ from sklearn.metrics import accuracy_score, roc_auc_score
 import joblib
 import os
 
+from registry import ModelRegistry
+
 # Configuration
 PROCESSED_DIR = 'data/processed'
 MODEL_DIR = 'src/models'
+MODEL_NAME = 'mortality'
 
 def train_model():
     print("Loading data...")
@@ -63,6 +66,14 @@ def train_model():
     model_path = os.path.join(MODEL_DIR, 'model.joblib')
     joblib.dump(model, model_path)
     print(f"Model saved to {model_path}")
+    
+    # Register a new version; the first one becomes champion, later ones challenger
+    registry = ModelRegistry()
+    ref = registry.register(MODEL_NAME, model, scaler, X_train.columns.tolist(),
+                            test_auc=auc, extra={'test_accuracy': accuracy})
+    alias = 'challenger' if 'champion' in registry.aliases() else 'champion'
+    registry.set_alias(alias, ref)
+    print(f"Registered {ref} as {alias}.")
 
 if __name__ == "__main__":
     train_model()
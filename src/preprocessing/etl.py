@@ -2,6 +2,8 @@ import zipfile
 import pandas as pd
 import numpy as np
 import os
+import json
+from datetime import datetime, timezone
 from sklearn.model_selection import train_test_split
 
 # Configuration
@@ -9,6 +11,11 @@ ZIP_PATH = 'archive (3).zip'
 RAW_DIR = 'data/raw'
 PROCESSED_DIR = 'data/processed'
 TARGET_FILES = ['ADMISSIONS.csv', 'PATIENTS.csv', 'LABEVENTS.csv']
+AGGREGATES_PATH = os.path.join(PROCESSED_DIR, 'aggregates.json')
+
+# Cohort breakdowns served by the API analytics endpoints: (label, lower bound, upper bound)
+AGE_BANDS = [('<40', 0, 39), ('40-59', 40, 59), ('60-74', 60, 74), ('75+', 75, None)]
+ABNORMAL_BUCKETS = [('0', 0, 0), ('1-5', 1, 5), ('6-20', 6, 20), ('21-50', 21, 50), ('51+', 51, None)]
 
 def extract_data():
     if not os.path.exists(RAW_DIR):
@@ -124,7 +131,70 @@ def save_data(df):
     test.to_csv(os.path.join(PROCESSED_DIR, 'test.csv'), index=False)
     print(f"Saved processed data to {PROCESSED_DIR}")
 
+def _band_labels(values, bands):
+    # Map numeric values onto the label of the band they fall into
+    labels = pd.Series(index=values.index, dtype=object)
+    for label, low, high in bands:
+        mask = values >= low if high is None else values.between(low, high)
+        labels[mask] = label
+    return labels
+
+def _mortality_table(df, groups, order, target):
+    grouped = df.groupby(groups)[target].agg(['count', 'sum'])
+    rows = []
+    for label in order:
+        if label not in grouped.index:
+            continue
+        admissions = int(grouped.loc[label, 'count'])
+        deaths = int(grouped.loc[label, 'sum'])
+        rows.append({
+            'label': label,
+            'admissions': admissions,
+            'deaths': deaths,
+            'mortality_rate': deaths / admissions if admissions else 0.0
+        })
+    return rows
+
+def build_aggregates(df):
+    """Precompute the cohort mortality breakdowns served by the API."""
+    target = 'hospital_expire_flag'
+    type_cols = [c for c in df.columns if c.startswith('type_')]
+    
+    tables = {}
+    if type_cols:
+        # Recover the admission type from its one-hot encoding
+        adm_types = df[type_cols].astype(float).idxmax(axis=1).str[len('type_'):]
+        tables['admission_type'] = _mortality_table(df, adm_types, [c[len('type_'):] for c in type_cols], target)
+    tables['age_band'] = _mortality_table(
+        df, _band_labels(df['age'], AGE_BANDS), [b[0] for b in AGE_BANDS], target)
+    tables['abnormal_labs'] = _mortality_table(
+        df, _band_labels(df['abnormal_count'], ABNORMAL_BUCKETS), [b[0] for b in ABNORMAL_BUCKETS], target)
+    
+    admissions = int(len(df))
+    deaths = int(df[target].sum())
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'overall': {
+            'admissions': admissions,
+            'deaths': deaths,
+            'mortality_rate': deaths / admissions if admissions else 0.0
+        },
+        'breakdowns': tables
+    }
+
+def save_aggregates(aggregates):
+    if not os.path.exists(PROCESSED_DIR):
+        os.makedirs(PROCESSED_DIR)
+    
+    # Write then rename so the API never reads a half-written file
+    tmp_path = AGGREGATES_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(aggregates, f, indent=2)
+    os.replace(tmp_path, AGGREGATES_PATH)
+    print(f"Saved cohort aggregates to {AGGREGATES_PATH}")
+
 if __name__ == "__main__":
     extract_data()
     df = load_and_process()
     save_data(df)
+    save_aggregates(build_aggregates(df))